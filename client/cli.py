@@ -107,8 +107,7 @@ def _cmd_run(args: argparse.Namespace) -> int:
                 break
             else:
                 _print_ingest_summary(resp)
-                for r in batch:
-                    state.files[r.file_path] = r.scan_ts
+                state.files.update((r.file_path, r.scan_ts) for r in batch)
                 save_state(state_path, state)
 
         print(
@@ -125,10 +124,8 @@ def _cmd_run(args: argparse.Namespace) -> int:
 
 
 def _now_schedule_key() -> str:
-    now = datetime.now()
-    day = now.strftime("%a")
-    hm = now.strftime("%H%M")
-    return f"{day}{hm}"
+    # Keys look like Mon0910: one strftime builds the whole key.
+    return datetime.now().strftime("%a%H%M")
 
 
 def _cmd_daemon(args: argparse.Namespace) -> int:
@@ -195,8 +192,7 @@ def _cmd_daemon(args: argparse.Namespace) -> int:
                                     records=batch,
                                 )
                                 _print_ingest_summary(resp)
-                                for r in batch:
-                                    state.files[r.file_path] = r.scan_ts
+                                state.files.update((r.file_path, r.scan_ts) for r in batch)
                                 save_state(state_path, state)
                             state.schedule_last_run[key] = today
                             save_state(state_path, state)
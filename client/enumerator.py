@@ -23,11 +23,14 @@ def _normalize_scan_roots(scan_paths: list[str]) -> list[str]:
         seen.add(root)
         roots.append(root)
 
+    # Sorting by path components puts every root directly after its ancestors, so a nested root
+    # only ever needs checking against the most recently kept one: O(N log N), not O(N^2).
     pruned: list[str] = []
-    for root in sorted(roots, key=lambda p: (p.count(os.sep), p)):
-        if any(is_subpath(root, kept) for kept in pruned):
+    for root in sorted(roots, key=lambda p: Path(os.path.normcase(p)).parts):
+        if pruned and is_subpath(root, pruned[-1]):
             continue
         pruned.append(root)
+    pruned.sort(key=lambda p: (p.count(os.sep), p))
     return pruned
 
 
@@ -71,16 +74,17 @@ def iter_files(config: ClientConfig) -> Iterable[FileEntry]:
                 exclude_dir_paths.append(normalize_path(candidate))
             else:
                 exclude_dir_paths.append(normalize_path(os.path.join(root, raw)))
+        # root is already resolved and os.walk never descends through symlinked directories, so
+        # every dirpath it yields is a real path: joining names onto it needs no per-entry resolve().
         for dirpath, dirnames, filenames in os.walk(root, topdown=True, followlinks=False):
-            dirpath_norm = normalize_path(dirpath)
-            if any(is_subpath(dirpath_norm, ex) for ex in exclude_dir_paths):
+            if any(is_subpath(dirpath, ex) for ex in exclude_dir_paths):
                 dirnames[:] = []
                 continue
             kept_dirs: list[str] = []
             for d in dirnames:
                 if d in exclude_dir_names:
                     continue
-                full = normalize_path(os.path.join(dirpath, d))
+                full = os.path.join(dirpath, d)
                 if any(is_subpath(full, ex) for ex in exclude_dir_paths):
                     continue
                 try:
@@ -93,12 +97,16 @@ def iter_files(config: ClientConfig) -> Iterable[FileEntry]:
             dirnames[:] = kept_dirs
 
             for name in filenames:
-                full_path = normalize_path(os.path.join(dirpath, name))
+                full_path = os.path.join(dirpath, name)
                 ext = Path(name).suffix.lower()
                 if ext in exclude_exts:
                     continue
                 try:
                     file_stat = os.lstat(full_path)
+                    if stat.S_ISLNK(file_stat.st_mode):
+                        # Symlinked files are reported under their resolved target, as before.
+                        full_path = normalize_path(full_path)
+                        file_stat = os.lstat(full_path)
                 except FileNotFoundError:
                     continue
                 if stat.S_ISLNK(file_stat.st_mode):
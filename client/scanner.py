@@ -5,6 +5,7 @@ import os
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable
 
 from .enumerator import FileEntry, iter_files
 from .state import ClientState
@@ -65,8 +66,12 @@ def _parse_last_scan(value: str) -> datetime | None:
     return parsed
 
 
-def select_files_for_run(config: ClientConfig, state: ClientState) -> list[FileEntry]:
-    entries = list(iter_files(config))
+def select_files_for_run(
+    config: ClientConfig, state: ClientState, entries: Iterable[FileEntry] | None = None
+) -> list[FileEntry]:
+    # Callers running several passes over an unchanged tree can enumerate once and pass entries.
+    if entries is None:
+        entries = iter_files(config)
     unscanned: list[FileEntry] = []
     scanned: list[tuple[datetime, str, FileEntry]] = []
     for entry in entries:
@@ -88,9 +93,10 @@ def scan_files(
     state: ClientState,
     quota_gb: int | None,
     skip_paths: set[str] | None = None,
+    entries: Iterable[FileEntry] | None = None,
 ) -> tuple[list[ScanRecord], int]:
     now_ts = iso_now()
-    files = select_files_for_run(config, state)
+    files = select_files_for_run(config, state, entries)
     quota_bytes = None if quota_gb is None else int(quota_gb) * (1024**3)
     skip_paths = skip_paths or set()
 
@@ -21,7 +21,8 @@ class ClientState:
 def _atomic_write_json(path: Path, payload: dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    # Compact separators: the files map dominates the payload and is rewritten on every save.
+    tmp.write_bytes(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
     os.replace(tmp, path)
 
 
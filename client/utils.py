@@ -31,18 +31,18 @@ def ceil_gb(size_bytes: int) -> int:
     return int(math.ceil(size_bytes / (1024**3)))
 
 
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
+
 def format_bytes(size_bytes: int) -> str:
     if size_bytes <= 0:
         return "0 B"
-    units = ["B", "KB", "MB", "GB", "TB", "PB"]
-    size = float(size_bytes)
-    unit_index = 0
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
+    # Each 1024x step is 10 more bits, so the unit index is read off the bit length.
+    unit_index = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    size = size_bytes / (1 << (unit_index * 10))
     if size >= 10 or unit_index == 0:
-        return f"{size:.0f} {units[unit_index]}"
-    return f"{size:.1f} {units[unit_index]}"
+        return f"{size:.0f} {_SIZE_UNITS[unit_index]}"
+    return f"{size:.1f} {_SIZE_UNITS[unit_index]}"
 
 
 def setup_logger(path: str | Path) -> logging.Logger:
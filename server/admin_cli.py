@@ -11,28 +11,7 @@ from .graph import (
     render_dot,
     render_mermaid_flowchart,
 )
-
-
-def _format_bytes(size_bytes: int) -> str:
-    if size_bytes <= 0:
-        return "0 B"
-    size = float(size_bytes)
-    units = ["B", "KB", "MB", "GB", "TB", "PB"]
-    unit_index = 0
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
-    if size >= 10 or unit_index == 0:
-        return f"{size:.0f} {units[unit_index]}"
-    return f"{size:.1f} {units[unit_index]}"
-
-
-def _attach_human_sizes(records: list[dict[str, object]]) -> list[dict[str, object]]:
-    for record in records:
-        size_value = record.get("size_bytes")
-        if isinstance(size_value, int):
-            record["size_human"] = _format_bytes(size_value)
-    return records
+from .sizes import _attach_human_sizes
 
 
 def _to_str(v: object) -> str:
@@ -252,22 +231,21 @@ def _cmd_query_machine(args: argparse.Namespace) -> int:
             for r in records:
                 r["sha256_count"] = sha_count
         else:
-            sha_values = sorted({str(r.get("sha256", "")) for r in records if r.get("sha256")})
+            sha_values = sorted({r["sha256"] for r in records if r.get("sha256")})
             if sha_values:
-                placeholders = ",".join("?" for _ in sha_values)
                 rows = conn.execute(
-                    f"""
+                    """
                     SELECT sha256, COUNT(*) AS c
                     FROM file_record
                     WHERE machine_name = ?
-                      AND sha256 IN ({placeholders})
+                      AND sha256 IN (SELECT value FROM json_each(?))
                     GROUP BY sha256
                     """,
-                    (args.machine_name, *sha_values),
+                    (args.machine_name, json.dumps(sha_values)),
                 ).fetchall()
-                sha_counts = {str(r["sha256"]): int(r["c"]) for r in rows}
+                sha_counts = {r["sha256"]: r["c"] for r in rows}
                 for r in records:
-                    r["sha256_count"] = sha_counts.get(str(r.get("sha256", "")), 0)
+                    r["sha256_count"] = sha_counts.get(r.get("sha256"), 0)
         if args.human:
             records = _attach_human_sizes(records)
 
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import os
+import queue
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator
 
 
 def get_db_path() -> Path:
@@ -13,18 +16,73 @@ def get_db_path() -> Path:
     return Path("data/fim.sqlite3")
 
 
-def connect() -> sqlite3.Connection:
-    db_path = get_db_path()
+def connect(db_path: Path | None = None, *, read_only: bool = False) -> sqlite3.Connection:
+    if db_path is None:
+        db_path = get_db_path()
     db_path.parent.mkdir(parents=True, exist_ok=True)
     busy_timeout_ms = int(os.environ.get("FIM_DB_BUSY_TIMEOUT_MS", "5000"))
-    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-65536;")
+    if read_only:
+        # Long-lived readers map the file instead of copying every page through read();
+        # query_only turns a stray write into an error rather than a contending write lock.
+        mmap_size = int(os.environ.get("FIM_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+        conn.execute(f"PRAGMA mmap_size = {int(mmap_size)};")
+        conn.execute("PRAGMA query_only = ON;")
     return conn
 
 
+class ConnectionPool:
+    """Long-lived connections to one DB file, reused across requests.
+
+    The DB path is resolved once at construction so a pool never mixes databases.
+    """
+
+    def __init__(
+        self, db_path: Path | None = None, *, max_idle: int = 8, read_only: bool = False
+    ) -> None:
+        self._db_path = db_path if db_path is not None else get_db_path()
+        self._max_idle = int(max_idle)
+        self._read_only = read_only
+        self._idle: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect(self._db_path, read_only=self._read_only)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed or self._idle.qsize() >= self._max_idle:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 def init_db(conn: sqlite3.Connection) -> None:
     conn.executescript(
         """
@@ -53,9 +111,21 @@ def init_db(conn: sqlite3.Connection) -> None:
           ingested_at TEXT
         );
 
-        CREATE INDEX IF NOT EXISTS idx_file_record_sha256 ON file_record(sha256);
+        -- (filter, scan_ts) indexes let "ORDER BY scan_ts DESC, id DESC LIMIT ?" walk the index
+        -- backwards and stop early; id is the rowid, the implicit ascending trailing key, so the
+        -- backwards walk already yields it DESC. The web UI's sha256_count subqueries are answered
+        -- from these indexes alone; machine_sha_time is what keeps query_machine's per-sha256
+        -- (machine_name, sha256) counts cheap.
+        DROP INDEX IF EXISTS idx_file_record_sha256;
+        CREATE INDEX IF NOT EXISTS idx_file_record_sha_time ON file_record(sha256, scan_ts);
         CREATE INDEX IF NOT EXISTS idx_file_record_machine_time ON file_record(machine_name, scan_ts);
+        CREATE INDEX IF NOT EXISTS idx_file_record_machine_sha_time ON file_record(machine_name, sha256, scan_ts);
         CREATE INDEX IF NOT EXISTS idx_file_record_machine_path_time ON file_record(machine_name, file_path, scan_ts);
+        -- Name search orders by (file_name, scan_ts DESC, id DESC) and walks this index forwards,
+        -- where the implicit rowid key would come out ascending: id DESC is declared so the
+        -- tie-break needs no sort either. LIKE is evaluated against index entries before touching
+        -- the table.
+        CREATE INDEX IF NOT EXISTS idx_file_record_name_time ON file_record(file_name, scan_ts DESC, id DESC);
         """
     )
     # Lightweight migration for existing databases.
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import operator
 import re
 import sqlite3
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Iterable
+from typing import Iterable, Iterator
 
 
 @dataclass(frozen=True)
@@ -17,6 +18,8 @@ class ShaSegment:
 
 
 _SAFE_NODE_RE = re.compile(r"[^a-zA-Z0-9_]+")
+_SEG_KEY = operator.attrgetter("start_date", "file_path", "file_name")
+_SEG_MACHINE_KEY = operator.attrgetter("machine_name", "start_date", "file_path", "file_name")
 
 
 def _scan_date_from_urn_or_ts(urn: str, scan_ts: str | None) -> str:
@@ -41,6 +44,7 @@ def fetch_segments_for_sha256(
     conn: sqlite3.Connection, *, sha256: str, limit: int = 20000
 ) -> list[ShaSegment]:
     limit = max(1, min(int(limit), 200000))
+    # Iterate the cursor directly; only the per-file date lists are kept, not every row.
     rows = conn.execute(
         """
         SELECT machine_name, file_path, file_name, urn, scan_ts
@@ -50,56 +54,65 @@ def fetch_segments_for_sha256(
         LIMIT ?
         """,
         (sha256, limit),
-    ).fetchall()
+    )
 
     grouped: dict[tuple[str, str, str], list[str]] = {}
     for r in rows:
-        machine = str(r["machine_name"] or "")
-        file_path = str(r["file_path"] or "")
-        file_name = str(r["file_name"] or "")
-        urn = str(r["urn"] or "")
-        scan_ts = str(r["scan_ts"] or "")
+        # TEXT columns already come back as str; only NULLs need replacing.
+        machine = r["machine_name"] or ""
+        file_path = r["file_path"] or ""
+        file_name = r["file_name"] or ""
+        urn = r["urn"] or ""
+        scan_ts = r["scan_ts"] or ""
         d = _scan_date_from_urn_or_ts(urn, scan_ts)
         grouped.setdefault((machine, file_path, file_name), []).append(d)
 
     segments: list[ShaSegment] = []
     for (machine, file_path, file_name), dates in grouped.items():
-        unique_sorted = sorted(set(dates))
-        if not unique_sorted:
+        if not dates:
             continue
+        # Only the bounds are used; ISO dates compare correctly as strings.
         segments.append(
             ShaSegment(
                 machine_name=machine,
                 file_path=file_path,
                 file_name=file_name,
-                start_date=unique_sorted[0],
-                end_date=unique_sorted[-1],
+                start_date=min(dates),
+                end_date=max(dates),
             )
         )
 
-    segments.sort(key=lambda s: (s.machine_name, s.start_date, s.file_path, s.file_name))
+    segments.sort(key=_SEG_MACHINE_KEY)
     return segments
 
 
-def render_ascii_chain(segments: Iterable[ShaSegment]) -> str:
+def _disp(s: ShaSegment) -> str:
+    label = s.file_name or "(no-name)"
+    if s.file_path:
+        return f"{label} @ {s.file_path}"
+    return label
+
+
+def _group_by_machine(segments: Iterable[ShaSegment]) -> dict[str, list[ShaSegment]]:
     by_machine: dict[str, list[ShaSegment]] = {}
     for seg in segments:
         by_machine.setdefault(seg.machine_name, []).append(seg)
+    return by_machine
 
-    lines: list[str] = []
-    for machine, segs in sorted(by_machine.items()):
-        segs_sorted = sorted(segs, key=lambda s: (s.start_date, s.file_path, s.file_name))
-        def _disp(s: ShaSegment) -> str:
-            label = s.file_name or "(no-name)"
-            if s.file_path:
-                return f"{label} @ {s.file_path}"
-            return label
+
+def iter_ascii_chain(segments: Iterable[ShaSegment]) -> Iterator[str]:
+    by_machine = _group_by_machine(segments)
+    for machine in sorted(by_machine):
+        segs_sorted = sorted(by_machine[machine], key=_SEG_KEY)
         parts = [
             f"{{{_disp(s)} {s.start_date}..{s.end_date}}}" for s in segs_sorted
         ]
         chain = " -> ".join(parts) if parts else "(no data)"
-        lines.append(f"{machine} {chain}")
-    return "\n".join(lines)
+        yield f"{machine} {chain}"
+
+
+def render_ascii_chain(segments: Iterable[ShaSegment]) -> str:
+    return "\n".join(iter_ascii_chain(segments))
 
 
 def _node_id(machine: str, file_path: str, file_name: str) -> str:
@@ -108,49 +121,50 @@ def _node_id(machine: str, file_path: str, file_name: str) -> str:
     return safe[:120]
 
 
-def render_mermaid_flowchart(segments: Iterable[ShaSegment]) -> str:
-    by_machine: dict[str, list[ShaSegment]] = {}
-    for seg in segments:
-        by_machine.setdefault(seg.machine_name, []).append(seg)
-
-    lines: list[str] = ["flowchart LR"]
-    for machine, segs in sorted(by_machine.items()):
-        lines.append(f'  subgraph {machine}')
-        segs_sorted = sorted(segs, key=lambda s: (s.start_date, s.file_path, s.file_name))
+def iter_mermaid_flowchart(segments: Iterable[ShaSegment]) -> Iterator[str]:
+    by_machine = _group_by_machine(segments)
+    yield "flowchart LR"
+    for machine in sorted(by_machine):
+        yield f'  subgraph {machine}'
+        segs_sorted = sorted(by_machine[machine], key=_SEG_KEY)
         prev_id: str | None = None
         for s in segs_sorted:
             nid = _node_id(machine, s.file_path, s.file_name)
             display_path = s.file_path or "(no-path)"
             display_name = s.file_name or "(no-name)"
             label = f"{display_name}\\n{display_path}\\n{s.start_date}..{s.end_date}"
-            lines.append(f'    {nid}["{label}"]')
+            yield f'    {nid}["{label}"]'
             if prev_id is not None:
-                lines.append(f"    {prev_id} --> {nid}")
+                yield f"    {prev_id} --> {nid}"
             prev_id = nid
-        lines.append("  end")
-    return "\n".join(lines)
+        yield "  end"
 
 
-def render_dot(segments: Iterable[ShaSegment]) -> str:
-    by_machine: dict[str, list[ShaSegment]] = {}
-    for seg in segments:
-        by_machine.setdefault(seg.machine_name, []).append(seg)
+def render_mermaid_flowchart(segments: Iterable[ShaSegment]) -> str:
+    return "\n".join(iter_mermaid_flowchart(segments))
+
 
-    lines: list[str] = ["digraph fim {", "  rankdir=LR;"]
-    for machine, segs in sorted(by_machine.items()):
-        lines.append(f'  subgraph "cluster_{machine}" {{')
-        lines.append(f'    label="{machine}";')
-        segs_sorted = sorted(segs, key=lambda s: (s.start_date, s.file_path, s.file_name))
+def iter_dot(segments: Iterable[ShaSegment]) -> Iterator[str]:
+    by_machine = _group_by_machine(segments)
+    yield "digraph fim {"
+    yield "  rankdir=LR;"
+    for machine in sorted(by_machine):
+        yield f'  subgraph "cluster_{machine}" {{'
+        yield f'    label="{machine}";'
+        segs_sorted = sorted(by_machine[machine], key=_SEG_KEY)
         prev_id: str | None = None
         for s in segs_sorted:
             nid = _node_id(machine, s.file_path, s.file_name)
             display_path = s.file_path or "(no-path)"
             display_name = s.file_name or "(no-name)"
             label = f"{display_name}\\n{display_path}\\n{s.start_date}..{s.end_date}"
-            lines.append(f'    "{nid}" [label="{label}"];')
+            yield f'    "{nid}" [label="{label}"];'
             if prev_id is not None:
-                lines.append(f'    "{prev_id}" -> "{nid}";')
+                yield f'    "{prev_id}" -> "{nid}";'
             prev_id = nid
-        lines.append("  }")
-    lines.append("}")
-    return "\n".join(lines)
+        yield "  }"
+    yield "}"
+
+
+def render_dot(segments: Iterable[ShaSegment]) -> str:
+    return "\n".join(iter_dot(segments))
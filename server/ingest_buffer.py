@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import asyncio
 import sqlite3
+import threading
+from collections import deque
 from typing import Any
 
 from .db import connect
@@ -32,7 +34,11 @@ class IngestBuffer:
         self._flush_max_rows = int(flush_max_rows)
         self._max_pending_rows = int(max_pending_rows)
 
-        self._pending_rows: list[tuple[Any, ...]] = []
+        self._pending_rows: deque[tuple[Any, ...]] = deque()
+
+        # Single long-lived writer connection; reopening per flush re-runs pragmas.
+        self._conn: sqlite3.Connection | None = None
+        self._conn_lock = threading.Lock()
 
         self._lock = asyncio.Lock()
         self._wakeup = asyncio.Event()
@@ -42,6 +48,9 @@ class IngestBuffer:
     async def start(self) -> None:
         if self._task is not None:
             return
+        # Bind the writer to the DB configured at startup, not whatever is current at first flush.
+        with self._conn_lock:
+            self._writer_conn()
         self._task = asyncio.create_task(self._run(), name="fim_ingest_buffer")
 
     async def stop(self) -> None:
@@ -52,10 +61,34 @@ class IngestBuffer:
             return
         await task
         self._task = None
+        self._close_conn()
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect()
+        return self._conn
+
+    def _close_conn(self) -> None:
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert_batch(self, batch: list[tuple[Any, ...]]) -> None:
+        with self._conn_lock:
+            conn = self._writer_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(INSERT_SQL, batch)
+                conn.commit()
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
 
     async def pending_count(self) -> int:
-        async with self._lock:
-            return len(self._pending_rows)
+        # len() on the deque is atomic; no need to wait on the enqueue/flush lock.
+        return len(self._pending_rows)
 
     async def enqueue(
         self,
@@ -80,21 +113,17 @@ class IngestBuffer:
             if not self._pending_rows:
                 return 0
             n = min(len(self._pending_rows), max_rows)
-            batch = self._pending_rows[:n]
-            del self._pending_rows[:n]
+            popleft = self._pending_rows.popleft
+            batch = [popleft() for _ in range(n)]
 
         try:
-            conn = connect()
-            try:
-                conn.executemany(INSERT_SQL, batch)
-                conn.commit()
-            finally:
-                conn.close()
+            # Blocking SQLite I/O runs off the event loop so /ingest keeps enqueueing.
+            await asyncio.to_thread(self._insert_batch, batch)
         except sqlite3.Error:
             get_logger().exception("db flush failed; preserving buffered rows")
             async with self._lock:
                 # Prepend so order is preserved as best as possible.
-                self._pending_rows = batch + self._pending_rows
+                self._pending_rows.extendleft(reversed(batch))
             raise
 
         return len(batch)
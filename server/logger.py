@@ -1,14 +1,27 @@
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 
 _LOGGER_NAME = "fimserver"
 _LOG_PATH = Path("logs") / "fimserver.log"
 
+_listener: QueueListener | None = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def get_logger() -> logging.Logger:
+    global _listener
     logger = logging.getLogger(_LOGGER_NAME)
     if logger.handlers:
         return logger
@@ -26,7 +39,12 @@ def get_logger() -> logging.Logger:
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
+    # Callers (often on the event loop) only enqueue; a listener thread does the file/stream I/O.
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+
+    logger.addHandler(QueueHandler(log_queue))
     logger.propagate = False
     return logger
@@ -2,28 +2,31 @@ from __future__ import annotations
 
 import sqlite3
 from datetime import datetime
+from functools import lru_cache
 from math import ceil
 from typing import Any
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
 from .auth import extract_bearer_token, machine_identity_for_token
-from .db import connect, init_db, now_iso_text
+from .db import ConnectionPool, connect, init_db, now_iso_text
 from .ingest_buffer import BufferFullError, IngestBuffer
 from .logger import get_logger
 from .models import IngestRequest
 
 
-app = FastAPI(title="FimSystem", version="0.1.0")
+app = FastAPI(title="FimSystem", version="0.1.0", default_response_class=ORJSONResponse)
 
 
-async def get_db() -> sqlite3.Connection:
-    conn = connect()
+async def get_db(request: Request) -> sqlite3.Connection:
+    pool: ConnectionPool = request.app.state.db_pool
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 @app.on_event("startup")
@@ -33,6 +36,9 @@ async def _startup() -> None:
         init_db(conn)
     finally:
         conn.close()
+    # Request handlers only read (token lookups); the IngestBuffer owns the single writer
+    # connection, so reads never queue behind an ingest transaction's lock.
+    app.state.db_pool = ConnectionPool(read_only=True)
     app.state.ingest_buffer = IngestBuffer()
     await app.state.ingest_buffer.start()
 
@@ -43,6 +49,10 @@ async def _shutdown() -> None:
     if buf is not None:
         await buf.stop()
         delattr(app.state, "ingest_buffer")
+    pool = getattr(app.state, "db_pool", None)
+    if pool is not None:
+        pool.close()
+        delattr(app.state, "db_pool")
 
 
 def _client_ip(request: Request) -> str:
@@ -69,10 +79,16 @@ def _ceil_gb(size_bytes: int) -> int:
     return int(ceil(size_bytes / (1024**3)))
 
 
+@lru_cache(maxsize=1024)
+def _scan_date(scan_ts: str) -> str:
+    # Caches the derived date string itself; models.parse_scan_ts is the validator's cache.
+    return datetime.fromisoformat(scan_ts).date().isoformat()
+
+
 def _make_urn(
     *, machine_name: str, file_name: str, extension: str, size_bytes: int, scan_ts: str
 ) -> str:
-    scan_date = datetime.fromisoformat(scan_ts).date().isoformat()
+    scan_date = _scan_date(scan_ts)
     size_gb = _ceil_gb(size_bytes)
     return f"{machine_name}:{file_name}:{extension}:{size_gb}:{scan_date}"
 
@@ -94,26 +110,28 @@ async def ingest(
     authorization: str | None = Header(default=None),
     conn: sqlite3.Connection = Depends(get_db),
 ) -> dict[str, Any]:
-    machine_id, machine_name = _require_machine_identity(conn, authorization)
+    # The token lookup is blocking SQLite I/O; keep it off the event loop.
+    machine_id, machine_name = await run_in_threadpool(
+        _require_machine_identity, conn, authorization
+    )
     ip = _client_ip(request)
     ingested_at = now_iso_text()
 
-    accepted_records = [rec for rec in payload.records if rec.size_bytes > 0]
-    skipped_zero_size = len(payload.records) - len(accepted_records)
-    if skipped_zero_size:
-        get_logger().warning("ingest skipped zero-size files", extra={"count": skipped_zero_size})
-
+    # Payload-level fields are shared by every row; bind them once.
+    mac = payload.mac
+    tag = payload.tag
+    host_name = payload.host_name
     rows = [
         (
             machine_name,
             machine_id,
-            payload.mac,
+            mac,
             rec.file_name,
             rec.file_path,
             rec.size_bytes,
             rec.sha256,
-            payload.tag,
-            payload.host_name,
+            tag,
+            host_name,
             ip,
             rec.scan_ts,
             _make_urn(
@@ -125,8 +143,13 @@ async def ingest(
             ),
             ingested_at,
         )
-        for rec in accepted_records
+        for rec in payload.records
+        if rec.size_bytes > 0
     ]
+    skipped_zero_size = len(payload.records) - len(rows)
+    if skipped_zero_size:
+        get_logger().warning("ingest skipped zero-size files", extra={"count": skipped_zero_size})
+
     buf = getattr(app.state, "ingest_buffer", None)
     if buf is None:
         get_logger().error("ingest failed: buffer not available")
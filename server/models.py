@@ -1,33 +1,33 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import lru_cache
 
 from pydantic import BaseModel, Field, field_validator
 
 
+@lru_cache(maxsize=1024)
+def parse_scan_ts(value: str) -> datetime:
+    # A client run stamps every record with the same scan_ts, so most lookups are hits.
+    return datetime.fromisoformat(value)
+
+
 class RecordIn(BaseModel):
     file_path: str
     file_name: str
     extension: str = ""
-    size_bytes: int
+    size_bytes: int = Field(ge=0)
     sha256: str = Field(min_length=64, max_length=64)
     scan_ts: str
     urn: str | None = None
 
-    @field_validator("size_bytes")
-    @classmethod
-    def _non_negative_int(cls, value: int) -> int:
-        if value < 0:
-            raise ValueError("must be >= 0")
-        return value
-
     @field_validator("scan_ts")
     @classmethod
     def _valid_scan_ts(cls, value: str) -> str:
         if not isinstance(value, str) or not value.strip():
             raise ValueError("scan_ts must be a non-empty ISO 8601 timestamp")
         try:
-            parsed = datetime.fromisoformat(value)
+            parsed = parse_scan_ts(value)
         except ValueError as exc:
             raise ValueError("scan_ts must be ISO 8601 format") from exc
         if parsed.tzinfo is None:
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
+
+def _format_bytes(size_bytes: int) -> str:
+    if size_bytes <= 0:
+        return "0 B"
+    # floor(log1024(n)) straight from the bit length instead of a divide loop.
+    unit_index = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    size = size_bytes / (1 << (unit_index * 10))
+    if size >= 10 or unit_index == 0:
+        return f"{size:.0f} {_SIZE_UNITS[unit_index]}"
+    return f"{size:.1f} {_SIZE_UNITS[unit_index]}"
+
+
+def _cached_format_bytes(size_bytes: int, cache: dict[int, str]) -> str:
+    # Snapshots of the same file repeat sizes heavily; callers keep one cache per response so
+    # each distinct size is formatted once.
+    text = cache.get(size_bytes)
+    if text is None:
+        text = cache[size_bytes] = _format_bytes(size_bytes)
+    return text
+
+
+def _attach_human_sizes(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    size_human: dict[int, str] = {}
+    for record in records:
+        size_value = record.get("size_bytes")
+        if isinstance(size_value, int):
+            record["size_human"] = _cached_format_bytes(size_value, size_human)
+    return records
@@ -1,81 +1,207 @@
 from __future__ import annotations
 
+import hashlib
 import sqlite3
+import time
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from .db import connect, init_db
+from .db import ConnectionPool, connect, init_db
 from .graph import (
     fetch_segments_for_sha256,
-    render_ascii_chain,
-    render_dot,
-    render_mermaid_flowchart,
+    iter_ascii_chain,
+    iter_dot,
+    iter_mermaid_flowchart,
 )
+from .sizes import _cached_format_bytes
 
 
 WEB_ROOT = Path(__file__).resolve().parent / "webui"
-
-app = FastAPI(title="FimWebUI", version="0.1.0")
-
-
-def _format_bytes(size_bytes: int) -> str:
-    if size_bytes <= 0:
-        return "0 B"
-    size = float(size_bytes)
-    units = ["B", "KB", "MB", "GB", "TB", "PB"]
-    unit_index = 0
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
-    if size >= 10 or unit_index == 0:
-        return f"{size:.0f} {units[unit_index]}"
-    return f"{size:.1f} {units[unit_index]}"
-
-
-def _dedupe_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    seen: set[tuple[str, str]] = set()
-    out: list[dict[str, Any]] = []
-    for r in records:
-        key = (str(r.get("file_path", "")), str(r.get("file_name", "")))
-        if key in seen:
-            continue
-        seen.add(key)
-        out.append(r)
-    return out
-
-
-def _apply_size_human(records: list[dict[str, Any]]) -> None:
-    for r in records:
-        size = r.get("size_bytes")
+# The machine dropdown tolerates brief staleness; avoid a DISTINCT scan per page load.
+MACHINES_CACHE_TTL_SEC = 10.0
+
+# index.html is tiny and only changes on deploy: read it once instead of stat+open per request.
+_INDEX_BYTES = (WEB_ROOT / "index.html").read_bytes()
+# Weak: GZipMiddleware serves gzip and identity bodies of the page under this one tag.
+_INDEX_ETAG = 'W/"' + hashlib.md5(_INDEX_BYTES, usedforsecurity=False).hexdigest() + '"'
+_INDEX_HEADERS = {"ETag": _INDEX_ETAG, "Cache-Control": "public, max-age=60"}
+
+app = FastAPI(title="FimWebUI", version="0.1.0", default_response_class=ORJSONResponse)
+# Record listings repeat machine names, paths and timestamps on every row and compress ~10x.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+def _tuple_cursor(conn: sqlite3.Connection, sql: str, params: tuple[object, ...]) -> sqlite3.Cursor:
+    # Plain tuples skip building a sqlite3.Row per row; callers read column names once from
+    # cursor.description instead.
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur.execute(sql, params)
+
+
+def _fetch_dicts(conn: sqlite3.Connection, sql: str, params: tuple[object, ...]) -> list[dict[str, Any]]:
+    cur = _tuple_cursor(conn, sql, params)
+    keys = [d[0] for d in cur.description]
+    return [dict(zip(keys, row)) for row in cur]
+
+
+def _fetch_records(
+    conn: sqlite3.Connection, sql: str, params: tuple[object, ...], *, dedupe: bool
+) -> list[dict[str, Any]]:
+    # Single pass: each row becomes its final response dict; sha256_count comes from the query.
+    cur = _tuple_cursor(conn, sql, params)
+    keys = [d[0] for d in cur.description]
+    path_i = keys.index("file_path")
+    name_i = keys.index("file_name")
+    # Rows arrive newest first, so the first row per (file_path, file_name) is the one kept.
+    # Dedupe applies to the page LIMIT already cut, so the query can stop early on the index.
+    seen: set[tuple[Any, Any]] = set()
+    size_human: dict[int, str] = {}
+    records: list[dict[str, Any]] = []
+    for row in cur:
+        if dedupe:
+            key = (row[path_i], row[name_i])
+            if key in seen:
+                continue
+            seen.add(key)
+        r = dict(zip(keys, row))
+        size = r["size_bytes"]
         if isinstance(size, int):
-            r["size_human"] = _format_bytes(size)
-
-
-def _limit_value(limit: int | None, *, max_limit: int) -> int | None:
+            r["size_human"] = _cached_format_bytes(size, size_human)
+        records.append(r)
+    return records
+
+
+_RECORD_COLUMNS = "machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn"
+
+
+def _records_sql(where: str, *, sha256_count: str) -> str:
+    # sha256_count is the SQL for the count column. A scalar subquery that does not reference the
+    # outer row runs once per statement, so the count costs one index lookup and the page query
+    # still walks its (filter, scan_ts) index and stops at LIMIT.
+    return f"""
+        SELECT {_RECORD_COLUMNS}, {sha256_count} AS sha256_count
+        FROM file_record
+        WHERE {where}
+        ORDER BY scan_ts DESC, id DESC
+        LIMIT ?
+        """
+
+
+def _name_sql(*, by_machine: bool) -> str:
+    machine_filter = "AND machine_name = ?" if by_machine else ""
+    return f"""
+        SELECT file_name, sha256, scan_ts, ingested_at
+        FROM file_record
+        WHERE file_name LIKE ?
+          {machine_filter}
+        ORDER BY file_name ASC, scan_ts DESC, id DESC
+        LIMIT ?
+        """
+
+
+# Every query shape is built once at import; requests just pick one by their flags, so there is
+# no per-request SQL assembly and the statement cache always sees identical text.
+_FLAGS = (False, True)
+_QUERY_FILE_SQL = _records_sql(
+    "sha256 = ?", sha256_count="(SELECT COUNT(*) FROM file_record WHERE sha256 = ?)"
+)
+_QUERY_MACHINE_SHA_SQL = _records_sql(
+    "machine_name = ? AND sha256 = ?",
+    sha256_count="(SELECT COUNT(*) FROM file_record WHERE machine_name = ? AND sha256 = ?)",
+)
+# Without a sha filter each row is counted within its own sha256 on this machine. The page is cut
+# first, then every distinct sha256 on it is counted once from idx_file_record_machine_sha_time, so
+# an unlimited page full of one repeated hash costs one count, not one per row.
+_QUERY_MACHINE_PAGE_SQL = f"""
+    WITH page AS MATERIALIZED (
+        SELECT {_RECORD_COLUMNS}, id
+        FROM file_record
+        WHERE machine_name = ?
+        ORDER BY scan_ts DESC, id DESC
+        LIMIT ?
+    ),
+    sha_counts AS (
+        SELECT sha256, COUNT(*) AS sha256_count
+        FROM file_record
+        WHERE machine_name = ? AND sha256 IN (SELECT sha256 FROM page)
+        GROUP BY sha256
+    )
+    SELECT {", ".join(f"page.{c} AS {c}" for c in _RECORD_COLUMNS.split(", "))},
+           COALESCE(sha_counts.sha256_count, 0) AS sha256_count
+    FROM page LEFT JOIN sha_counts ON sha_counts.sha256 = page.sha256
+    ORDER BY page.scan_ts DESC, page.id DESC
+    """
+_QUERY_NAME_SQL = {by_machine: _name_sql(by_machine=by_machine) for by_machine in _FLAGS}
+
+
+def _text_chunks(lines: Iterable[str], *, batch: int = 1024) -> Iterator[str]:
+    # Same bytes as "\n".join(lines), emitted in batches: one chunk per line would cost one
+    # threadpool hop per line when Starlette drains this sync iterator.
+    it = iter(lines)
+    sep = ""
+    while chunk := list(islice(it, batch)):
+        yield sep + "\n".join(chunk)
+        sep = "\n"
+
+
+# SQLite reads a negative LIMIT as "no limit", so every query can bind LIMIT ? unconditionally.
+_NO_LIMIT = -1
+
+
+def _limit_value(limit: int | None, *, max_limit: int) -> int:
     if limit is None:
-        return None
+        return _NO_LIMIT
     limit_val = int(limit)
     if limit_val <= 0:
-        return None
+        return _NO_LIMIT
     return min(limit_val, max_limit)
 
 
 @app.on_event("startup")
 async def _startup() -> None:
+    # Schema setup happens once here on a throwaway connection; the pool itself is read-only.
     conn = connect()
     try:
         init_db(conn)
     finally:
         conn.close()
+    app.state.db_pool = ConnectionPool(read_only=True)
+    app.state.machines_cache = (0.0, None)
+
 
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    pool = getattr(app.state, "db_pool", None)
+    if pool is not None:
+        pool.close()
+        delattr(app.state, "db_pool")
 
-@app.get("/", response_class=FileResponse)
-def index() -> FileResponse:
-    return FileResponse(WEB_ROOT / "index.html")
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison (W/ prefixes are ignored), may list several tags, and
+    # "*" matches any current representation.
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+@app.get("/", response_class=Response)
+def index(if_none_match: str | None = Header(default=None)) -> Response:
+    if _etag_matches(if_none_match, _INDEX_ETAG):
+        return Response(status_code=304, headers=_INDEX_HEADERS)
+    return Response(content=_INDEX_BYTES, media_type="text/html", headers=_INDEX_HEADERS)
 
 
 @app.get("/healthz")
@@ -88,15 +214,17 @@ app.mount("/static", StaticFiles(directory=WEB_ROOT), name="static")
 
 @app.get("/api/machines")
 def list_machines() -> dict[str, list[str]]:
-    conn = connect()
-    try:
-        init_db(conn)
+    cached_at, machines = getattr(app.state, "machines_cache", (0.0, None))
+    now = time.monotonic()
+    if machines is not None and now - cached_at < MACHINES_CACHE_TTL_SEC:
+        return {"machines": machines}
+    with app.state.db_pool.connection() as conn:
         rows = conn.execute(
             "SELECT DISTINCT machine_name FROM file_record WHERE machine_name IS NOT NULL ORDER BY machine_name ASC"
         ).fetchall()
-    finally:
-        conn.close()
-    return {"machines": [str(r["machine_name"]) for r in rows if r["machine_name"]]}
+    machines = [r["machine_name"] for r in rows if r["machine_name"]]
+    app.state.machines_cache = (now, machines)
+    return {"machines": machines}
 
 
 @app.get("/api/query/file")
@@ -107,44 +235,13 @@ def query_file(
 ) -> dict[str, Any]:
     if len(sha256) != 64:
         raise HTTPException(status_code=400, detail="sha256 must be 64 hex chars")
-    conn = connect()
-    try:
-        init_db(conn)
+    with app.state.db_pool.connection() as conn:
         limit_val = _limit_value(limit, max_limit=20000)
-        if limit_val is None:
-            rows = conn.execute(
-                """
-                SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                FROM file_record
-                WHERE sha256 = ?
-                ORDER BY scan_ts DESC, id DESC
-                """,
-                (sha256,),
-            ).fetchall()
-        else:
-            rows = conn.execute(
-                """
-                SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                FROM file_record
-                WHERE sha256 = ?
-                ORDER BY scan_ts DESC, id DESC
-                LIMIT ?
-                """,
-                (sha256, limit_val),
-            ).fetchall()
-        sha_count = conn.execute(
-            "SELECT COUNT(*) FROM file_record WHERE sha256 = ?",
-            (sha256,),
-        ).fetchone()[0]
-    finally:
-        conn.close()
+        # The count subquery comes first in the SQL and binds its own copy of the filter.
+        params = (sha256, sha256, limit_val)
+        records = _fetch_records(conn, _QUERY_FILE_SQL, params, dedupe=dedupe)
 
-    records = [dict(r) for r in rows]
-    for r in records:
-        r["sha256_count"] = sha_count
-    _apply_size_human(records)
-    if dedupe:
-        records = _dedupe_records(records)
+    sha_count = records[0]["sha256_count"] if records else 0
     return {"sha256": sha256, "records": records, "sha256_count": sha_count}
 
 
@@ -157,86 +254,17 @@ def query_machine(
 ) -> dict[str, Any]:
     if sha256 is not None and len(sha256) != 64:
         raise HTTPException(status_code=400, detail="sha256 must be 64 hex chars")
-    conn = connect()
-    try:
-        init_db(conn)
+    with app.state.db_pool.connection() as conn:
         limit_val = _limit_value(limit, max_limit=50000)
         if sha256 is None:
-            if limit_val is None:
-                rows = conn.execute(
-                    """
-                    SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                    FROM file_record
-                    WHERE machine_name = ?
-                    ORDER BY scan_ts DESC, id DESC
-                    """,
-                    (machine_name,),
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    """
-                    SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                    FROM file_record
-                    WHERE machine_name = ?
-                    ORDER BY scan_ts DESC, id DESC
-                    LIMIT ?
-                    """,
-                    (machine_name, limit_val),
-                ).fetchall()
-        else:
-            if limit_val is None:
-                rows = conn.execute(
-                    """
-                    SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                    FROM file_record
-                    WHERE machine_name = ? AND sha256 = ?
-                    ORDER BY scan_ts DESC, id DESC
-                    """,
-                    (machine_name, sha256),
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    """
-                    SELECT machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                    FROM file_record
-                    WHERE machine_name = ? AND sha256 = ?
-                    ORDER BY scan_ts DESC, id DESC
-                    LIMIT ?
-                    """,
-                    (machine_name, sha256, limit_val),
-                ).fetchall()
-
-        records = [dict(r) for r in rows]
-        if sha256:
-            sha_count = conn.execute(
-                "SELECT COUNT(*) FROM file_record WHERE machine_name = ? AND sha256 = ?",
-                (machine_name, sha256),
-            ).fetchone()[0]
-            for r in records:
-                r["sha256_count"] = sha_count
+            sql = _QUERY_MACHINE_PAGE_SQL
+            params: tuple[object, ...] = (machine_name, limit_val, machine_name)
         else:
-            sha_values = sorted({str(r.get("sha256", "")) for r in records if r.get("sha256")})
-            if sha_values:
-                placeholders = ",".join("?" for _ in sha_values)
-                rows = conn.execute(
-                    f"""
-                    SELECT sha256, COUNT(*) AS c
-                    FROM file_record
-                    WHERE machine_name = ?
-                      AND sha256 IN ({placeholders})
-                    GROUP BY sha256
-                    """,
-                    (machine_name, *sha_values),
-                ).fetchall()
-                sha_counts = {str(r["sha256"]): int(r["c"]) for r in rows}
-                for r in records:
-                    r["sha256_count"] = sha_counts.get(str(r.get("sha256", "")), 0)
-    finally:
-        conn.close()
+            # The count subquery comes first in the SQL and binds its own copy of the filter.
+            sql = _QUERY_MACHINE_SHA_SQL
+            params = (machine_name, sha256, machine_name, sha256, limit_val)
+        records = _fetch_records(conn, sql, params, dedupe=dedupe)
 
-    _apply_size_human(records)
-    if dedupe:
-        records = _dedupe_records(records)
     payload: dict[str, Any] = {"machine_name": machine_name, "records": records}
     if sha256:
         payload["sha256"] = sha256
@@ -250,40 +278,13 @@ def query_name(
     limit: int | None = 0,
 ) -> dict[str, Any]:
     pattern = f"%{substring}%"
-    conn = connect()
-    try:
-        init_db(conn)
+    with app.state.db_pool.connection() as conn:
         limit_val = _limit_value(limit, max_limit=50000)
-        where = "WHERE file_name LIKE ?"
-        params: list[object] = [pattern]
-        if machine_name:
-            where += " AND machine_name = ?"
-            params.append(machine_name)
-        if limit_val is None:
-            rows = conn.execute(
-                f"""
-                SELECT file_name, sha256, scan_ts, ingested_at
-                FROM file_record
-                {where}
-                ORDER BY file_name ASC, scan_ts DESC, id DESC
-                """,
-                tuple(params),
-            ).fetchall()
-        else:
-            rows = conn.execute(
-                f"""
-                SELECT file_name, sha256, scan_ts, ingested_at
-                FROM file_record
-                {where}
-                ORDER BY file_name ASC, scan_ts DESC, id DESC
-                LIMIT ?
-                """,
-                tuple(params + [limit_val]),
-            ).fetchall()
-    finally:
-        conn.close()
+        params: tuple[object, ...] = (
+            (pattern, machine_name, limit_val) if machine_name else (pattern, limit_val)
+        )
+        records = _fetch_dicts(conn, _QUERY_NAME_SQL[bool(machine_name)], params)
 
-    records = [dict(r) for r in rows]
     payload: dict[str, Any] = {"records": records}
     if machine_name:
         payload["machine_name"] = machine_name
@@ -296,19 +297,19 @@ def graph_sha256(
     fmt: str = Query("ascii", pattern="^(ascii|dot|mermaid|json)$"),
     limit: int | None = 20000,
 ) -> Any:
-    conn = connect()
-    try:
-        init_db(conn)
-        segments = fetch_segments_for_sha256(
-            conn, sha256=sha256, limit=_limit_value(limit, max_limit=200000) or 20000
-        )
-    finally:
-        conn.close()
+    limit_val = _limit_value(limit, max_limit=200000)
+    if limit_val == _NO_LIMIT:
+        limit_val = 20000
+    with app.state.db_pool.connection() as conn:
+        segments = fetch_segments_for_sha256(conn, sha256=sha256, limit=limit_val)
 
-    if fmt == "dot":
-        return PlainTextResponse(render_dot(segments))
-    if fmt == "mermaid":
-        return PlainTextResponse(render_mermaid_flowchart(segments))
     if fmt == "json":
         return {"sha256": sha256, "segments": [s.__dict__ for s in segments]}
-    return PlainTextResponse(render_ascii_chain(segments))
+    if fmt == "dot":
+        lines = iter_dot(segments)
+    elif fmt == "mermaid":
+        lines = iter_mermaid_flowchart(segments)
+    else:
+        lines = iter_ascii_chain(segments)
+    # Stream the rendered text instead of holding the whole graph as one string.
+    return StreamingResponse(_text_chunks(lines), media_type="text/plain")
@@ -13,8 +13,15 @@ from server.admin_cli import _cmd_query_machine, _cmd_query_name
 from server.db import connect, init_db
 
 
-def _insert_record(
-    conn,
+_INSERT_SQL = """
+    INSERT INTO file_record(
+      machine_name, machine_id, mac, file_name, file_path, size_bytes, sha256,
+      tag, host_name, client_ip, scan_ts, urn, ingested_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _record_row(
     *,
     machine_name: str,
     file_name: str,
@@ -30,36 +37,32 @@ def _insert_record(
     host_name: str = "",
     client_ip: str = "",
     urn: str | None = None,
-) -> None:
+) -> tuple[object, ...]:
     if file_path is None:
         file_path = f"/tmp/{file_name}"
     if urn is None:
         urn = f"{machine_name}:{file_name}:{extension}:1:2026-01-21"
-    conn.execute(
-        """
-        INSERT INTO file_record(
-          machine_name, machine_id, mac, file_name, file_path, size_bytes, sha256,
-          tag, host_name, client_ip, scan_ts, urn, ingested_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            machine_name,
-            machine_id,
-            mac,
-            file_name,
-            file_path,
-            size_bytes,
-            sha256,
-            tag,
-            host_name,
-            client_ip,
-            scan_ts,
-            urn,
-            ingested_at,
-        ),
+    return (
+        machine_name,
+        machine_id,
+        mac,
+        file_name,
+        file_path,
+        size_bytes,
+        sha256,
+        tag,
+        host_name,
+        client_ip,
+        scan_ts,
+        urn,
+        ingested_at,
     )
 
 
+def _insert_record(conn, **fields) -> None:
+    conn.execute(_INSERT_SQL, _record_row(**fields))
+
+
 def _capture_output(func, args) -> str:
     buf = io.StringIO()
     with redirect_stdout(buf):
@@ -134,16 +137,20 @@ class AdminCliTests(unittest.TestCase):
         conn = connect()
         try:
             init_db(conn)
-            for i in range(250):
-                _insert_record(
-                    conn,
-                    machine_name="M1",
-                    file_name=f"f{i}.bin",
-                    sha256=format(i, "064x"),
-                    scan_ts="2026-01-21T00:00:00+00:00",
-                    ingested_at="2026-01-21T00:01+00:00",
+            with conn:
+                conn.executemany(
+                    _INSERT_SQL,
+                    (
+                        _record_row(
+                            machine_name="M1",
+                            file_name=f"f{i}.bin",
+                            sha256=format(i, "064x"),
+                            scan_ts="2026-01-21T00:00:00+00:00",
+                            ingested_at="2026-01-21T00:01+00:00",
+                        )
+                        for i in range(250)
+                    ),
                 )
-            conn.commit()
         finally:
             conn.close()
 
@@ -4,6 +4,7 @@ import os
 import tempfile
 import unittest
 
+from client.enumerator import _normalize_scan_roots, iter_files
 from client.scanner import scan_files, select_files_for_run
 from client.state import ClientState
 
@@ -15,6 +16,16 @@ class ClientScannerTests(unittest.TestCase):
             f.write(b"x" * size)
         return path
 
+    def _write_files(self, root: str, names: list[str]) -> None:
+        # Bulk fixture creation: raw fds skip the buffered file object built by open() per file.
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        for name in names:
+            fd = os.open(os.path.join(root, name), flags, 0o644)
+            try:
+                os.write(fd, b"x")
+            finally:
+                os.close(fd)
+
     def test_select_files_orders_by_last_scan(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
             path_a = self._write_file(tmp, "a.txt")
@@ -48,8 +59,7 @@ class ClientScannerTests(unittest.TestCase):
 
     def test_round_robin_progresses_with_large_pool(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
-            for i in range(10_000):
-                self._write_file(tmp, f"file_{i:05d}.bin")
+            self._write_files(tmp, [f"file_{i:05d}.bin" for i in range(10_000)])
 
             class StubConfig:
                 scan_paths = [tmp]
@@ -59,12 +69,62 @@ class ClientScannerTests(unittest.TestCase):
 
             config = StubConfig()
             state = ClientState(machine_id="m2", files={}, schedule_last_run={})
+            # The pool does not change between runs; enumerate it once instead of 200 times.
+            entries = list(iter_files(config))
+            self.assertEqual(len(entries), 10_000)
 
-            seen: set[str] = set()
+            picked: list[str] = []
             for _ in range(200):
-                records, _ = scan_files(config=config, state=state, quota_gb=0)
+                records, _ = scan_files(config=config, state=state, quota_gb=0, entries=entries)
                 self.assertEqual(len(records), 1)
                 rec = records[0]
-                self.assertNotIn(rec.file_path, seen)
-                seen.add(rec.file_path)
+                picked.append(rec.file_path)
                 state.files[rec.file_path] = rec.scan_ts
+            # Every run must pick a file that has not been scanned yet.
+            self.assertEqual(len(set(picked)), len(picked))
+
+    def test_normalize_scan_roots_prunes_nested_and_duplicate_roots(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = os.path.realpath(tmp)
+            # "a-b" and "a.b" sort between "a" and "a/b" as plain strings ('-' < '.' < '/'), so
+            # "a/b" is not adjacent to its parent unless roots are ordered by path components.
+            for rel in ("a", "a-b", "a.b", os.path.join("a", "b", "c")):
+                os.makedirs(os.path.join(tmp, rel), exist_ok=True)
+            a, a_dash_b, a_dot_b = (os.path.join(tmp, n) for n in ("a", "a-b", "a.b"))
+            a_b = os.path.join(a, "b")
+
+            roots = _normalize_scan_roots(
+                [a_b, a_dot_b, a_dash_b, os.path.join(a_b, "c"), a, a_b, a_dash_b + os.sep]
+            )
+            self.assertEqual(roots, [a, a_dash_b, a_dot_b])
+
+            roots = _normalize_scan_roots([a_b, a_dash_b, a_dot_b, a_b])
+            self.assertEqual(roots, [a_dash_b, a_dot_b, a_b])
+
+    def test_iter_files_resolves_symlinks_and_skips_excluded(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = os.path.realpath(tmp)
+            root = os.path.join(tmp, "root")
+            outside = os.path.join(tmp, "outside")
+            for rel in ("skip", os.path.join("nested", "private")):
+                os.makedirs(os.path.join(root, rel))
+            os.makedirs(outside)
+            keep = self._write_file(root, "keep.txt")
+            nested = self._write_file(os.path.join(root, "nested"), "ok.txt")
+            target = self._write_file(outside, "real.txt")
+            self._write_file(os.path.join(root, "skip"), "hidden.txt")
+            self._write_file(os.path.join(root, "nested", "private"), "secret.txt")
+            try:
+                os.symlink(target, os.path.join(root, "link.txt"))
+                os.symlink(os.path.join(outside, "missing.txt"), os.path.join(root, "dangling.txt"))
+            except (OSError, NotImplementedError):
+                self.skipTest("symlinks are not available")
+
+            class StubConfig:
+                scan_paths = [root]
+                exclude_subdirs = ["skip", os.path.join("nested", "private")]
+                exclude_extensions: list[str] = []
+                size_threshold_kb_by_ext: dict = {}
+
+            paths = sorted(entry.path for entry in iter_files(StubConfig()))
+            self.assertEqual(paths, sorted([keep, nested, target]))
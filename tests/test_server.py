@@ -1,56 +1,99 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import os
+import sqlite3
 import tempfile
 import unittest
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
+import orjson
+
 from server.auth import create_or_rotate_token
 from server.db import connect, init_db
 from server.main import app
 
 
+_MACHINE_NAME = "MachineNameA"
+_INGEST_BASE = {"machine_id": "id1", "mac": "", "host_name": "host1", "tag": "test"}
+
+
+def _build_schema_image() -> tuple[bytes, str]:
+    # init_db and the machine token once per module; each test writes this image to its
+    # own file instead of re-running the schema DDL and token insert.
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        init_db(conn)
+        token = create_or_rotate_token(conn, _MACHINE_NAME)
+        return conn.serialize(), token
+    finally:
+        conn.close()
+
+
+_SCHEMA_IMAGE, _TOKEN = _build_schema_image()
+
+
 @dataclass(frozen=True, slots=True)
 class ASGIResponse:
     status_code: int
-    headers: dict[str, str]
+    raw_headers: list[tuple[bytes, bytes]]
     body: bytes
 
+    @property
+    def headers(self) -> dict[str, str]:
+        # Decoded on demand; most tests only look at the status and body.
+        return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in self.raw_headers}
+
     @property
     def text(self) -> str:
         return self.body.decode("utf-8", errors="replace")
 
     def json(self) -> Any:
-        return json.loads(self.body)
+        return orjson.loads(self.body)
 
 
 class LifespanManager:
     def __init__(self, asgi_app: Any):
         self._app = asgi_app
-        self._receive_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-        self._send_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
         self._task: asyncio.Task[None] | None = None
+        # The lifespan protocol is strict request/reply, so one pending future per
+        # direction is enough; no queue is needed.
+        self._received: asyncio.Future[dict[str, Any]] | None = None
+        self._sent: asyncio.Future[dict[str, Any]] | None = None
+
+    async def _exchange(self, message: dict[str, Any]) -> dict[str, Any]:
+        assert self._received is not None and self._sent is not None
+        self._received.set_result(message)
+        reply = await self._sent
+        self._sent = asyncio.get_running_loop().create_future()
+        return reply
 
     async def __aenter__(self) -> "LifespanManager":
+        loop = asyncio.get_running_loop()
+        self._received = loop.create_future()
+        self._sent = loop.create_future()
+
         async def run() -> None:
             scope = {"type": "lifespan"}
 
             async def receive() -> dict[str, Any]:
-                return await self._receive_queue.get()
+                assert self._received is not None
+                message = await self._received
+                self._received = loop.create_future()
+                return message
 
             async def send(message: dict[str, Any]) -> None:
-                await self._send_queue.put(message)
+                assert self._sent is not None
+                self._sent.set_result(message)
 
             await self._app(scope, receive, send)
 
         self._task = asyncio.create_task(run())
-        await self._receive_queue.put({"type": "lifespan.startup"})
-
-        message = await self._send_queue.get()
+        message = await self._exchange({"type": "lifespan.startup"})
         if message["type"] == "lifespan.startup.failed":
             raise RuntimeError(f"lifespan startup failed: {message!r}")
         if message["type"] != "lifespan.startup.complete":
@@ -59,9 +102,7 @@ class LifespanManager:
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[no-untyped-def]
-        await self._receive_queue.put({"type": "lifespan.shutdown"})
-
-        message = await self._send_queue.get()
+        message = await self._exchange({"type": "lifespan.shutdown"})
         if message["type"] == "lifespan.shutdown.failed":
             raise RuntimeError(f"lifespan shutdown failed: {message!r}")
         if message["type"] != "lifespan.shutdown.complete":
@@ -71,6 +112,16 @@ class LifespanManager:
         await self._task
 
 
+_BASE_SCOPE: dict[str, Any] = {
+    "type": "http",
+    "asgi": {"version": "3.0", "spec_version": "2.3"},
+    "http_version": "1.1",
+    "scheme": "http",
+    "client": ("testclient", 123),
+    "server": ("testserver", 80),
+}
+
+
 async def asgi_request(
     asgi_app: Any,
     *,
@@ -82,7 +133,7 @@ async def asgi_request(
     body = b""
     request_headers = dict(headers or {})
     if json_body is not None:
-        body = json.dumps(json_body).encode("utf-8")
+        body = orjson.dumps(json_body)
         request_headers.setdefault("content-type", "application/json")
 
     raw_headers: list[tuple[bytes, bytes]] = []
@@ -91,25 +142,19 @@ async def asgi_request(
     raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
 
     scope = {
-        "type": "http",
-        "asgi": {"version": "3.0", "spec_version": "2.3"},
-        "http_version": "1.1",
+        **_BASE_SCOPE,
         "method": method.upper(),
-        "scheme": "http",
         "path": path,
         "raw_path": path.encode("utf-8"),
         "query_string": b"",
         "headers": raw_headers,
-        "client": ("testclient", 123),
-        "server": ("testserver", 80),
     }
 
-    recv_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-    await recv_queue.put({"type": "http.request", "body": body, "more_body": False})
-    await recv_queue.put({"type": "http.disconnect"})
+    # The whole request body is known up front; after it, receive() reports a disconnect.
+    messages = iter(({"type": "http.request", "body": body, "more_body": False},))
 
     async def receive() -> dict[str, Any]:
-        return await recv_queue.get()
+        return next(messages, {"type": "http.disconnect"})
 
     status_code: int | None = None
     response_headers: list[tuple[bytes, bytes]] = []
@@ -119,7 +164,7 @@ async def asgi_request(
         nonlocal status_code, response_headers
         if message["type"] == "http.response.start":
             status_code = int(message["status"])
-            response_headers = list(message.get("headers", []))
+            response_headers = message.get("headers", [])
         elif message["type"] == "http.response.body":
             body_parts.append(message.get("body", b""))
         else:
@@ -130,11 +175,7 @@ async def asgi_request(
     if status_code is None:
         raise AssertionError("app did not send http.response.start")
 
-    normalized_headers: dict[str, str] = {}
-    for k, v in response_headers:
-        normalized_headers[k.decode("latin-1").lower()] = v.decode("latin-1")
-
-    return ASGIResponse(status_code=status_code, headers=normalized_headers, body=b"".join(body_parts))
+    return ASGIResponse(status_code=status_code, raw_headers=response_headers, body=b"".join(body_parts))
 
 
 class ServerTests(unittest.IsolatedAsyncioTestCase):
@@ -142,13 +183,10 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
         self._tmp = tempfile.TemporaryDirectory()
         self.db_path = os.path.join(self._tmp.name, "fim_test.sqlite3")
         os.environ["FIM_DB_PATH"] = self.db_path
-        conn = connect()
-        try:
-            init_db(conn)
-            self.machine_name = "MachineNameA"
-            self.token = create_or_rotate_token(conn, self.machine_name)
-        finally:
-            conn.close()
+        Path(self.db_path).write_bytes(_SCHEMA_IMAGE)
+        self.machine_name = _MACHINE_NAME
+        self.token = _TOKEN
+        self.auth_headers = {"Authorization": f"Bearer {self.token}"}
 
         self._lifespan = LifespanManager(app)
         await self._lifespan.__aenter__()
@@ -158,6 +196,15 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
         await self._lifespan.__aexit__(None, None, None)
         self._tmp.cleanup()
 
+    async def _ingest(self, records: list[dict[str, Any]], **overrides: Any) -> ASGIResponse:
+        return await asgi_request(
+            app,
+            method="POST",
+            path="/ingest",
+            headers=self.auth_headers,
+            json_body={**_INGEST_BASE, **overrides, "records": records},
+        )
+
     async def test_hello(self) -> None:
         resp = await asgi_request(app, method="GET", path="/hello")
         self.assertEqual(resp.status_code, 200, resp.text)
@@ -178,12 +225,6 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(resp.status_code, 401)
 
     async def test_ingest_change_detection(self) -> None:
-        base = {
-            "machine_id": "id1",
-            "mac": "00:11:22:33:44:55",
-            "host_name": "host1",
-            "tag": "test",
-        }
         rec1 = {
             "file_path": "/tmp/a.txt",
             "file_name": "a.txt",
@@ -192,13 +233,7 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
             "sha256": "0" * 64,
             "scan_ts": "2026-01-21T00:00:00+00:00",
         }
-        resp1 = await asgi_request(
-            app,
-            method="POST",
-            path="/ingest",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json_body={**base, "records": [rec1]},
-        )
+        resp1 = await self._ingest([rec1], mac="00:11:22:33:44:55")
         self.assertEqual(resp1.status_code, 200, resp1.text)
         body1 = resp1.json()
         self.assertEqual(body1["received"], 1)
@@ -206,19 +241,12 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
         rec2 = dict(rec1)
         rec2["sha256"] = "1" * 64
         rec2["scan_ts"] = "2026-01-21T00:00:10+00:00"
-        resp2 = await asgi_request(
-            app,
-            method="POST",
-            path="/ingest",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json_body={**base, "records": [rec2]},
-        )
+        resp2 = await self._ingest([rec2], mac="00:11:22:33:44:55")
         self.assertEqual(resp2.status_code, 200, resp2.text)
         body2 = resp2.json()
         self.assertEqual(body2["received"], 1)
 
     async def test_duplicates_reporting(self) -> None:
-        base = {"machine_id": "id1", "mac": "", "host_name": "host1", "tag": "test"}
         sha = "2" * 64
         recs = [
             {
@@ -238,19 +266,12 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
                 "scan_ts": "2026-01-21T00:00:10+00:00",
             },
         ]
-        resp = await asgi_request(
-            app,
-            method="POST",
-            path="/ingest",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json_body={**base, "records": recs},
-        )
+        resp = await self._ingest(recs)
         self.assertEqual(resp.status_code, 200, resp.text)
         body = resp.json()
         self.assertEqual(body["received"], 2)
 
     async def test_ingest_skips_zero_size(self) -> None:
-        base = {"machine_id": "id1", "mac": "", "host_name": "host1", "tag": "test"}
         rec_zero = {
             "file_path": "/tmp/zero.bin",
             "file_name": "zero.bin",
@@ -267,13 +288,7 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
             "sha256": "5" * 64,
             "scan_ts": "2026-01-21T00:00:10+00:00",
         }
-        resp = await asgi_request(
-            app,
-            method="POST",
-            path="/ingest",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json_body={**base, "records": [rec_zero, rec_ok]},
-        )
+        resp = await self._ingest([rec_zero, rec_ok])
         self.assertEqual(resp.status_code, 200, resp.text)
         body = resp.json()
         self.assertEqual(body["received"], 1)
@@ -301,7 +316,6 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(row_zero)
 
     async def test_ingest_sets_ingested_at(self) -> None:
-        base = {"machine_id": "id1", "mac": "", "host_name": "host1", "tag": "test"}
         rec = {
             "file_path": "/tmp/ingested_at.txt",
             "file_name": "ingested_at.txt",
@@ -310,13 +324,7 @@ class ServerTests(unittest.IsolatedAsyncioTestCase):
             "sha256": "3" * 64,
             "scan_ts": "2026-01-21T00:00:00+00:00",
         }
-        resp = await asgi_request(
-            app,
-            method="POST",
-            path="/ingest",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json_body={**base, "records": [rec]},
-        )
+        resp = await self._ingest([rec])
         self.assertEqual(resp.status_code, 200, resp.text)
 
         # Wait for ingest buffer flush.
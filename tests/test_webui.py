@@ -3,72 +3,147 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import sqlite3
 import tempfile
 import unittest
+from pathlib import Path
 from typing import Any
 
 from server.db import connect, init_db
 from server.web_app import app
 
 
+_FIXTURE_SQL = """
+    INSERT INTO file_record (
+        machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_FIXTURE_ROWS = [
+    (
+        "MachineA",
+        "/tmp/a.bin",
+        "a.bin",
+        1234,
+        "a" * 64,
+        "2026-01-01T00:00:00+00:00",
+        "2026-01-01T00:01:00+00:00",
+        "MachineA:a.bin:bin:1:2026-01-01",
+    ),
+    # Snapshots sharing one sha256, newest first: b.bin repeats, so dedupe has work to do.
+    *(
+        (machine, path, name, 10, "b" * 64, ts, ts, f"{machine}:{name}:bin:1:{ts[:10]}")
+        for machine, path, name, ts in (
+            ("MachineB", "/tmp/b.bin", "b.bin", "2026-01-04T00:00:00+00:00"),
+            ("MachineB", "/tmp/b.bin", "b.bin", "2026-01-03T00:00:00+00:00"),
+            ("MachineA", "/tmp/b_copy.bin", "b_copy.bin", "2026-01-02T12:00:00+00:00"),
+            ("MachineB", "/tmp/c.bin", "c.bin", "2026-01-02T00:00:00+00:00"),
+            ("MachineB", "/tmp/b.bin", "b.bin", "2026-01-01T00:00:00+00:00"),
+        )
+    ),
+]
+
+
+def _build_schema_image() -> bytes:
+    # init_db and the fixture rows once per module; each test writes this image to its
+    # own file instead of re-running the schema DDL and inserts.
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    try:
+        init_db(conn)
+        with conn:
+            conn.executemany(_FIXTURE_SQL, _FIXTURE_ROWS)
+        return conn.serialize()
+    finally:
+        conn.close()
+
+
+_SCHEMA_IMAGE = _build_schema_image()
+
+
 class LifespanManager:
     def __init__(self, asgi_app: Any):
         self._app = asgi_app
-        self._receive_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-        self._send_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
         self._task: asyncio.Task[None] | None = None
+        # The lifespan protocol is strict request/reply, so one pending future per
+        # direction is enough; no queue is needed.
+        self._received: asyncio.Future[dict[str, Any]] | None = None
+        self._sent: asyncio.Future[dict[str, Any]] | None = None
+
+    async def _exchange(self, message: dict[str, Any]) -> dict[str, Any]:
+        assert self._received is not None and self._sent is not None
+        self._received.set_result(message)
+        reply = await self._sent
+        self._sent = asyncio.get_running_loop().create_future()
+        return reply
 
     async def __aenter__(self) -> "LifespanManager":
+        loop = asyncio.get_running_loop()
+        self._received = loop.create_future()
+        self._sent = loop.create_future()
+
         async def run() -> None:
             scope = {"type": "lifespan"}
 
             async def receive() -> dict[str, Any]:
-                return await self._receive_queue.get()
+                assert self._received is not None
+                message = await self._received
+                self._received = loop.create_future()
+                return message
 
             async def send(message: dict[str, Any]) -> None:
-                await self._send_queue.put(message)
+                assert self._sent is not None
+                self._sent.set_result(message)
 
             await self._app(scope, receive, send)
 
         self._task = asyncio.create_task(run())
-        await self._receive_queue.put({"type": "lifespan.startup"})
-
-        message = await self._send_queue.get()
+        message = await self._exchange({"type": "lifespan.startup"})
         if message["type"] != "lifespan.startup.complete":
             raise RuntimeError(f"unexpected lifespan message: {message!r}")
 
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[no-untyped-def]
-        await self._receive_queue.put({"type": "lifespan.shutdown"})
-        message = await self._send_queue.get()
+        message = await self._exchange({"type": "lifespan.shutdown"})
         if message["type"] != "lifespan.shutdown.complete":
             raise RuntimeError(f"unexpected lifespan message: {message!r}")
         assert self._task is not None
         await self._task
 
 
-async def asgi_get(asgi_app: Any, path: str) -> tuple[int, dict[str, str], bytes]:
+_BASE_SCOPE: dict[str, Any] = {
+    "type": "http",
+    "asgi": {"version": "3.0", "spec_version": "2.3"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "client": ("testclient", 123),
+    "server": ("testserver", 80),
+    "headers": [(b"content-length", b"0")],
+}
+
+
+async def asgi_get(
+    asgi_app: Any, path: str, headers: dict[str, str] | None = None
+) -> tuple[int, dict[str, str], bytes]:
+    path, _, query = path.partition("?")
     scope = {
-        "type": "http",
-        "asgi": {"version": "3.0", "spec_version": "2.3"},
-        "http_version": "1.1",
-        "method": "GET",
-        "scheme": "http",
+        **_BASE_SCOPE,
         "path": path,
         "raw_path": path.encode("utf-8"),
-        "query_string": b"",
-        "headers": [(b"content-length", b"0")],
-        "client": ("testclient", 123),
-        "server": ("testserver", 80),
+        "query_string": query.encode("utf-8"),
     }
+    if headers:
+        scope["headers"] = _BASE_SCOPE["headers"] + [
+            (k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()
+        ]
 
-    recv_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-    await recv_queue.put({"type": "http.request", "body": b"", "more_body": False})
-    await recv_queue.put({"type": "http.disconnect"})
+    # The whole request body is known up front; after it, receive() reports a disconnect.
+    messages = iter(({"type": "http.request", "body": b"", "more_body": False},))
 
     async def receive() -> dict[str, Any]:
-        return await recv_queue.get()
+        return next(messages, {"type": "http.disconnect"})
 
     status_code: int | None = None
     response_headers: list[tuple[bytes, bytes]] = []
@@ -78,7 +153,7 @@ async def asgi_get(asgi_app: Any, path: str) -> tuple[int, dict[str, str], bytes
         nonlocal status_code, response_headers
         if message["type"] == "http.response.start":
             status_code = int(message["status"])
-            response_headers = list(message.get("headers", []))
+            response_headers = message.get("headers", [])
         elif message["type"] == "http.response.body":
             body_parts.append(message.get("body", b""))
 
@@ -95,29 +170,7 @@ class WebUiTests(unittest.IsolatedAsyncioTestCase):
         self._tmp = tempfile.TemporaryDirectory()
         self.db_path = os.path.join(self._tmp.name, "fim_test.sqlite3")
         os.environ["FIM_DB_PATH"] = self.db_path
-        conn = connect()
-        try:
-            init_db(conn)
-            conn.execute(
-                """
-                INSERT INTO file_record (
-                    machine_name, file_path, file_name, size_bytes, sha256, scan_ts, ingested_at, urn
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    "MachineA",
-                    "/tmp/a.bin",
-                    "a.bin",
-                    1234,
-                    "a" * 64,
-                    "2026-01-01T00:00:00+00:00",
-                    "2026-01-01T00:01:00+00:00",
-                    "MachineA:a.bin:bin:1:2026-01-01",
-                ),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        Path(self.db_path).write_bytes(_SCHEMA_IMAGE)
 
         self._lifespan = LifespanManager(app)
         await self._lifespan.__aenter__()
@@ -134,12 +187,121 @@ class WebUiTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(payload["sha256"], "a" * 64)
         self.assertEqual(len(payload["records"]), 1)
 
+    async def test_query_file_dedupes_the_limited_page(self) -> None:
+        # LIMIT counts rows before dedupe: the two newest rows are both b.bin, so one survives.
+        status, _, body = await asgi_get(app, "/api/query/file?limit=2&sha256=" + ("b" * 64))
+        self.assertEqual(status, 200)
+        records = json.loads(body)["records"]
+        self.assertEqual([r["scan_ts"] for r in records], ["2026-01-04T00:00:00+00:00"])
+
+        status, _, body = await asgi_get(app, "/api/query/file?limit=0&sha256=" + ("b" * 64))
+        self.assertEqual(status, 200)
+        records = json.loads(body)["records"]
+        self.assertEqual([r["file_name"] for r in records], ["b.bin", "b_copy.bin", "c.bin"])
+        self.assertEqual(records[0]["scan_ts"], "2026-01-04T00:00:00+00:00")
+
+        status, _, body = await asgi_get(
+            app, "/api/query/file?limit=2&dedupe=false&sha256=" + ("b" * 64)
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)["records"]), 2)
+
+    async def test_sha256_count_ignores_limit(self) -> None:
+        # The count covers every matching row, however many the page returns.
+        for limit in (1, 0):
+            with self.subTest(limit=limit):
+                status, _, body = await asgi_get(
+                    app, f"/api/query/file?limit={limit}&sha256=" + ("b" * 64)
+                )
+                self.assertEqual(status, 200)
+                payload = json.loads(body)
+                self.assertEqual(payload["sha256_count"], 5)
+                self.assertEqual({r["sha256_count"] for r in payload["records"]}, {5})
+
+                # query_machine counts within the machine only.
+                status, _, body = await asgi_get(
+                    app,
+                    f"/api/query/machine?machine_name=MachineB&limit={limit}&sha256=" + ("b" * 64),
+                )
+                self.assertEqual(status, 200)
+                records = json.loads(body)["records"]
+                self.assertTrue(records)
+                self.assertEqual({r["sha256_count"] for r in records}, {4})
+
+    async def test_query_machine_counts_each_sha256_on_the_machine(self) -> None:
+        status, _, body = await asgi_get(app, "/api/query/machine?machine_name=MachineA&limit=1")
+        self.assertEqual(status, 200)
+        records = json.loads(body)["records"]
+        # Only the newest row is on the page; its count still covers the whole machine.
+        self.assertEqual([(r["file_name"], r["sha256_count"]) for r in records], [("b_copy.bin", 1)])
+
+        status, _, body = await asgi_get(app, "/api/query/machine?machine_name=MachineB&limit=0")
+        self.assertEqual(status, 200)
+        records = json.loads(body)["records"]
+        self.assertEqual({r["sha256_count"] for r in records}, {4})
+
+    async def test_query_machine_unlimited_with_repeated_sha256(self) -> None:
+        # Thousands of rows sharing one hash: each row must still get the full machine count.
+        repeated = 3000
+        rows = []
+        for i in range(repeated):
+            ts = f"2026-02-01T00:{i // 60:02d}:{i % 60:02d}+00:00"
+            rows.append(("MachineC", f"/tmp/r{i}.bin", f"r{i}.bin", 10, "d" * 64, ts, ts, None))
+        conn = connect()
+        try:
+            with conn:
+                conn.executemany(_FIXTURE_SQL, rows)
+        finally:
+            conn.close()
+
+        status, _, body = await asgi_get(app, "/api/query/machine?machine_name=MachineC&limit=0")
+        self.assertEqual(status, 200)
+        records = json.loads(body)["records"]
+        self.assertEqual(len(records), repeated)
+        self.assertEqual({r["sha256_count"] for r in records}, {repeated})
+
     async def test_query_name(self) -> None:
         status, _, body = await asgi_get(app, "/api/query/name?substring=a.bin")
         self.assertEqual(status, 200)
         payload = json.loads(body)
         self.assertEqual(len(payload["records"]), 1)
 
+    async def test_query_name_matches_like_substrings(self) -> None:
+        cases = [
+            # (query string, expected file names in file_name ASC, scan_ts DESC order)
+            ("substring=bin", ["a.bin", "b.bin", "b.bin", "b.bin", "b_copy.bin", "c.bin"]),
+            ("substring=.BIN", ["a.bin", "b.bin", "b.bin", "b.bin", "b_copy.bin", "c.bin"]),
+            ("substring=b&machine_name=MachineA", ["a.bin", "b_copy.bin"]),
+            ("substring=copy", ["b_copy.bin"]),
+            ("substring=zz", []),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                status, _, body = await asgi_get(app, "/api/query/name?" + query)
+                self.assertEqual(status, 200)
+                records = json.loads(body)["records"]
+                self.assertEqual([r["file_name"] for r in records], expected)
+
+    async def test_index_revalidates_with_etag(self) -> None:
+        status, headers, body = await asgi_get(app, "/")
+        self.assertEqual(status, 200)
+        self.assertTrue(body)
+        etag = headers["etag"]
+        self.assertTrue(etag.startswith('W/"'), etag)
+
+        for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+            with self.subTest(if_none_match=if_none_match):
+                status, headers, body = await asgi_get(
+                    app, "/", headers={"If-None-Match": if_none_match}
+                )
+                self.assertEqual(status, 304)
+                self.assertEqual(body, b"")
+                self.assertEqual(headers["etag"], etag)
+
+        status, _, body = await asgi_get(app, "/", headers={"If-None-Match": '"other"'})
+        self.assertEqual(status, 200)
+        self.assertTrue(body)
+
     async def test_machines_list(self) -> None:
         status, _, body = await asgi_get(app, "/api/machines")
         self.assertEqual(status, 200)